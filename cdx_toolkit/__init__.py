@@ -1,13 +1,21 @@
 import logging
 import json
 from pkg_resources import get_distribution, DistributionNotFound
+from collections import deque
 from collections.abc import MutableMapping
 import sys
 import warnings
 
 __version__ = 'installed-from-git'
 
-from .myrequests import myrequests_get
+try:
+    # this works for the pip-installed package
+    # set before importing submodules, myrequests puts it in the User-Agent at import time
+    __version__ = get_distribution(__name__).version
+except DistributionNotFound:  # pragma: no cover
+    pass
+
+from .myrequests import myrequests_get, set_session
 from .compat import munge_fields, munge_filter
 from .commoncrawl import get_cc_endpoints, apply_cc_defaults, filter_cc_endpoints
 from .warc import fetch_wb_warc, fetch_warc_record
@@ -15,12 +23,6 @@ from .timeutils import validate_timestamps
 
 LOGGER = logging.getLogger(__name__)
 
-try:
-    # this works for the pip-installed package
-    __version__ = get_distribution(__name__).version
-except DistributionNotFound:  # pragma: no cover
-    pass
-
 
 lines_per_page = 3000  # no way to get this from the API without fetching a page
 
@@ -159,7 +161,7 @@ class CDXFetcherIter:
         self.endpoint = 0
         self.page = -1
         self.params['page'] = self.page
-        self.captures = []
+        self.captures = deque()
         self.index_list = index_list
 
         self.get_more()
@@ -192,7 +194,7 @@ class CDXFetcherIter:
     def __next__(self):
         while True:
             try:
-                return self.captures.pop(0)
+                return self.captures.popleft()
             except IndexError:
                 LOGGER.debug('getting more in __next__')
                 self.get_more()
@@ -256,6 +258,9 @@ class CDXFetcher:
         if 'limit' not in params:
             LOGGER.info('adding default limit=1000 to get')
             params['limit'] = 1000
+        else:
+            # this needs to be an int because we subtract from it below
+            params['limit'] = int(params['limit'])
         if self.source == 'cc':
             apply_cc_defaults(params)
 
@@ -284,6 +289,10 @@ class CDXFetcher:
                 params['filter'] = (params['filter'],)
             params['filter'] = munge_filter(params['filter'], self.source)
 
+        if 'limit' in params:
+            # this needs to be an int because we subtract from it in get_for_iter
+            params['limit'] = int(params['limit'])
+
         if self.source == 'cc':
             apply_cc_defaults(params, crawl_present=bool(self.crawl))
 
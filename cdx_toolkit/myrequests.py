@@ -1,5 +1,9 @@
 import requests
+from requests.adapters import HTTPAdapter
+import functools
 import logging
+import socket
+import threading
 import time
 from urllib.parse import urlparse
 
@@ -7,6 +11,28 @@ from . import __version__
 
 LOGGER = logging.getLogger(__name__)
 
+USER_AGENT = 'pypi_cdx_toolkit/'+__version__
+
+# one session for the whole process, so that tcp+tls connections to the
+# handful of hosts we talk to (cc index, cc data, ia) get reused.
+# retries stay in myrequests_get because they are tied to our rate limiting.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+SESSION.headers['User-Agent'] = USER_AGENT
+
+
+def set_session(session):
+    '''
+    Use a caller-supplied requests.Session for all fetches, e.g. for tests
+    or to add proxies. Its headers are used as-is, set
+    session.headers['User-Agent'] = USER_AGENT to keep ours.
+    '''
+    global SESSION
+    SESSION = session
+
+
 previously_seen_hostnames = {
     'commoncrawl.s3.amazonaws.com',
     'data.commoncrawl.org',
@@ -14,73 +40,131 @@ previously_seen_hostnames = {
 }
 
 
+RETRY_STATUS = frozenset((429, 500, 502, 503, 504, 509))
+CLIENT_ERROR_STATUS = frozenset((400, 404))
+MAX_LOGGED_BODY = 2048  # error pages can be large html
+
+
+# getaddrinfo "no such name", on posix and windows (WSAHOST_NOT_FOUND)
+DNS_NOT_FOUND_ERRNOS = frozenset(x for x in (getattr(socket, 'EAI_NONAME', None),
+                                             getattr(socket, 'EAI_NODATA', None),
+                                             11001) if x is not None)
+
+
+def is_dns_not_found(e):
+    '''Look for a not-found socket.gaierror in the chain of exceptions that requests and urllib3 wrap it in'''
+    seen = set()
+    todo = [e]
+    while todo:
+        e = todo.pop()
+        if not isinstance(e, BaseException) or id(e) in seen:
+            continue
+        seen.add(id(e))
+        if isinstance(e, socket.gaierror):
+            return e.errno in DNS_NOT_FOUND_ERRNOS
+        todo.extend((e.__cause__, e.__context__, getattr(e, 'reason', None)))
+        todo.extend(e.args)
+    return False
+
+
 def dns_fatal(hostname):
     '''We have a dns error, should we fail immediately or not?'''
-    if hostname not in previously_seen_hostnames:
-        return True
+    return hostname not in previously_seen_hostnames
+
+
+DEFAULT_MINIMUM_INTERVAL = 3.0
+DEFAULT_BURST = 1
+
+
+class HostRetry:
+    '''
+    Token bucket for one host: tokens refill at 1/minimum_interval per second,
+    up to burst, and each fetch takes one. burst=1 paces fetches exactly
+    minimum_interval apart; raise it to let an idle client catch up.
+    '''
+    __slots__ = ('minimum_interval', 'burst', 'tokens', 'last_refill')
+
+    def __init__(self, minimum_interval=DEFAULT_MINIMUM_INTERVAL, burst=DEFAULT_BURST):
+        self.minimum_interval = minimum_interval
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_refill = None  # set on first use
+
+    def refill(self, now):
+        if self.last_refill is not None:
+            earned = (now - self.last_refill) / self.minimum_interval
+            self.tokens = min(float(self.burst), self.tokens + earned)
+        self.last_refill = now
 
 
 retry_info = {
-    'default': {
-        'next_fetch': 0,
-        'minimum_interval': 3.0,
-    },
-    'index.commoncrawl.org': {
-        'next_fetch': 0,
-        'minimum_interval': 1.0,
-    },
-    'data.commoncrawl.org': {
-        'next_fetch': 0,
-        'minimum_interval': 0.55,
-    },
-    'web.archive.org': {
-        'next_fetch': 0,
-        'minimum_interval': 6.0,
-    },
+    'index.commoncrawl.org': HostRetry(minimum_interval=1.0),
+    'data.commoncrawl.org': HostRetry(minimum_interval=0.55),
+    'web.archive.org': HostRetry(minimum_interval=6.0),
 }
+retry_info_lock = threading.Lock()
 
 
 def get_retries(hostname):
-    if hostname not in retry_info:
-        retry_info[hostname] = retry_info['default'].copy()
-        LOGGER.debug('initializing retry info for new host '+hostname)
+    entry = retry_info.get(hostname)
+    if entry is None:
+        # locked so that threads fetching from a new host all share one entry
+        with retry_info_lock:
+            if hostname not in retry_info:
+                LOGGER.debug('initializing retry info for new host %s', hostname)
+            entry = retry_info.setdefault(hostname, HostRetry())
+    return entry
+
+
+def take_token(hostname):
+    '''Sleep until the token bucket for hostname allows another fetch'''
+    entry = get_retries(hostname)
+    # monotonic, so the bucket is immune to wall-clock jumps
+    entry.refill(time.monotonic())
+    if entry.tokens < 1.0:
+        dt = (1.0 - entry.tokens) * entry.minimum_interval
+        if dt > 3.1:
+            LOGGER.debug('sleeping for %.3fs before next fetch', dt)
+        time.sleep(dt)
+        entry.refill(time.monotonic())
+    entry.tokens -= 1.0
+    return entry.minimum_interval
+
+
+def fetch_done(hostname):
+    '''Time spent fetching and retrying does not earn tokens'''
+    retry_info[hostname].last_refill = time.monotonic()
+
+
+def slow_down(hostname):
+    '''The server asked us to slow down, spend any saved-up burst'''
     entry = retry_info[hostname]
-    if not entry['next_fetch']:
-        entry['next_fetch'] = time.time()
-    return entry['next_fetch'], entry['minimum_interval']
+    entry.tokens = min(entry.tokens, 0.0)
 
 
-def update_next_fetch(hostname, next_fetch):
-    retry_info[hostname]['next_fetch'] = next_fetch
+def normalize_params(params):
+    '''
+    Our kwarg is from_ts because from is a python reserved word, the cdx apis call it from.
+    Returns a copy if anything changed, the caller's dict is left alone.
+    '''
+    if not params or 'from_ts' not in params:
+        return params
+    params = params.copy()
+    params['from'] = params.pop('from_ts')
+    return params
 
 
-def myrequests_get(url, params=None, headers=None, cdx=False, allow404=False):
-    t = time.time()
+@functools.lru_cache(maxsize=4096)
+def url_hostname(url):
+    # urlparse is slow and we see the same cdx endpoints and warc urls over and over
+    return urlparse(url).hostname
 
-    hostname = urlparse(url).hostname
-    next_fetch, minimum_interval = get_retries(hostname)
 
-    if t < next_fetch:
-        dt = next_fetch - t
-        if dt > 3.1:
-            LOGGER.debug('sleeping for {:.3f}s before next fetch'.format(dt))
-        time.sleep(dt)
-    # next_fetch is also updated at the bottom
-    update_next_fetch(hostname, next_fetch + minimum_interval)
-
-    if params:
-        if 'from_ts' in params:
-            params['from'] = params['from_ts']
-            del params['from_ts']
-        if 'limit' in params:
-            if not isinstance(params['limit'], int):
-                # this needs to be an int because we subtract from it elsewhere
-                params['limit'] = int(params['limit'])
-
-    if headers is None:
-        headers = {}
-    if 'user-agent' not in headers:
-        headers['User-Agent'] = 'pypi_cdx_toolkit/'+__version__
+def myrequests_get(url, params=None, headers=None, cdx=False, allow404=False):
+    hostname = url_hostname(url)
+    minimum_interval = take_token(hostname)
+
+    params = normalize_params(params)
 
     retry = True
     retry_sec = 2 * minimum_interval
@@ -89,10 +173,11 @@ def myrequests_get(url, params=None, headers=None, cdx=False, allow404=False):
     connect_errors = 0
     while retry:
         try:
-            LOGGER.debug('getting %s %r', url, params)
-            resp = requests.get(url, params=params, headers=headers,
-                                timeout=(30., 30.), allow_redirects=False)
-            if cdx and resp.status_code in {400, 404}:
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.debug('getting %s %r', url, params)
+            resp = SESSION.get(url, params=params, headers=headers,
+                               timeout=(30., 30.), allow_redirects=False)
+            if cdx and resp.status_code in CLIENT_ERROR_STATUS:
                 # 400: ia html error page -- probably page= is too big -- not an error
                 # 404: pywb {'error': 'No Captures found for: www.pbxxxxxxm.com/*'} -- not an error
                 LOGGER.debug('giving up with status %d, no captures found', resp.status_code)
@@ -101,51 +186,51 @@ def myrequests_get(url, params=None, headers=None, cdx=False, allow404=False):
             if allow404 and resp.status_code == 404:
                 retry = False
                 break
-            if resp.status_code in {429, 500, 502, 503, 504, 509}:  # pragma: no cover
+            if resp.status_code in RETRY_STATUS:  # pragma: no cover
                 # 503=slow down, 50[24] are temporary outages, 500=Amazon S3 generic error
                 # CC takes a 503 from storage and then emits a 500 with error text in resp.text
                 # I have never seen IA or CC send 429 or 509, but just in case...
                 # 429 is also a slow down, IA started sending them mid-2023
                 retries += 1
+                slow_down(hostname)
                 level = 30 if retries > 5 else 20  # 30=warning 20=info
                 LOGGER.log(level, 'retrying after %.2fs for %d', retry_sec, resp.status_code)
-                if resp.text:
-                    LOGGER.log(level, 'response body is %s', resp.text)
+                if LOGGER.isEnabledFor(level) and resp.content:
+                    LOGGER.log(level, 'response body is %s', resp.text[:MAX_LOGGED_BODY])
                 time.sleep(retry_sec)
                 retry_sec = min(retry_sec*2, retry_max_sec)
                 continue
-            if resp.status_code in {400, 404}:  # pragma: no cover
-                if resp.text:
-                    LOGGER.info('response body is %s', resp.text)
+            if resp.status_code in CLIENT_ERROR_STATUS:  # pragma: no cover
+                if LOGGER.isEnabledFor(logging.INFO) and resp.content:
+                    LOGGER.info('response body is %s', resp.text[:MAX_LOGGED_BODY])
                 raise RuntimeError('invalid url of some sort, status={} {}'.format(resp.status_code, url))
             resp.raise_for_status()
             retry = False
         except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
                 requests.exceptions.Timeout) as e:
             connect_errors += 1
-            string = '{} failures for url {} {!r}: {}'.format(connect_errors, url, params, str(e))
 
-            if 'Name or service not known' in string:
-                if dns_fatal(url):
+            if is_dns_not_found(e):
+                if dns_fatal(hostname):
                     raise ValueError('invalid hostname in url '+url) from None
 
-            if connect_errors > 100:
-                LOGGER.error(string)
-                raise ValueError(string)
             if connect_errors > 10:
+                # only pay for formatting params when we are going to log it
+                string = '{} failures for url {} {!r}: {}'.format(connect_errors, url, params, str(e))
+                if connect_errors > 100:
+                    LOGGER.error(string)
+                    raise ValueError(string)
                 LOGGER.warning(string)
-            LOGGER.info('retrying after {:.2f}s for '.format(retry_max_sec)+str(e))
+            LOGGER.info('retrying after %.2fs for %s', retry_max_sec, e)
             time.sleep(retry_max_sec)  # notice the extra-long sleep
             retry_sec = min(retry_sec*2, retry_max_sec)
         except requests.exceptions.RequestException as e:  # pragma: no cover
             LOGGER.warning('something unexpected happened, giving up after %s', str(e))
             raise
 
-    hostname = urlparse(url).hostname
-    if hostname not in previously_seen_hostnames:
-        previously_seen_hostnames.add(hostname)
+    previously_seen_hostnames.add(hostname)
 
     # in case we had a lot of retries, etc
-    update_next_fetch(hostname, time.time() + minimum_interval)
+    fetch_done(hostname)
 
     return resp
@@ -1,6 +1,10 @@
+import calendar
 import datetime
+import functools
 from email.utils import parsedate
 import logging
+import re
+import time
 
 LOGGER = logging.getLogger(__name__)
 
@@ -16,6 +20,7 @@ TIMESTAMP_HIGH = '29991231235959'
 days_in_month = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
 
 
+@functools.lru_cache(maxsize=256)
 def pad_timestamp(ts):
     '''
     >>> pad_timestamp('1998')
@@ -24,6 +29,7 @@ def pad_timestamp(ts):
     return ts + TIMESTAMP_LOW[len(ts):]
 
 
+@functools.lru_cache(maxsize=256)
 def pad_timestamp_up(ts):
     '''
     >>> pad_timestamp_up('199802')
@@ -35,6 +41,31 @@ def pad_timestamp_up(ts):
     return ts
 
 
+# strptime is slow, so timestamp_to_time does its own arithmetic for the common case
+_YEAR_EPOCH = {y: calendar.timegm((y, 1, 1, 0, 0, 0, 0, 0, 0)) for y in range(1970, 2100)}
+_MONTH_OFFSET_COMMON = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+_MONTH_OFFSET_LEAP = (0, 0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335)
+
+
+def _fast_timestamp_to_time(padded):
+    if len(padded) != 14 or not padded.isascii() or not padded.isdigit():
+        return
+    y = int(padded[0:4])
+    mo = int(padded[4:6])
+    d = int(padded[6:8])
+    h = int(padded[8:10])
+    mi = int(padded[10:12])
+    s = int(padded[12:14])
+    if y not in _YEAR_EPOCH or not 1 <= mo <= 12 or d < 1 or h > 23 or mi > 59 or s > 59:
+        return
+    leap = calendar.isleap(y)
+    if d > days_in_month[mo] + (1 if leap and mo == 2 else 0):
+        return
+    month_offset = _MONTH_OFFSET_LEAP if leap else _MONTH_OFFSET_COMMON
+    return float(_YEAR_EPOCH[y] + (month_offset[mo] + d - 1)*86400 + h*3600 + mi*60 + s)
+
+
+@functools.lru_cache(maxsize=1024)
 def timestamp_to_time(ts):
     '''
     >>> timestamp_to_time('1999')
@@ -42,6 +73,10 @@ def timestamp_to_time(ts):
     '''
     utc = datetime.timezone.utc
     padded = pad_timestamp(ts)
+    t = _fast_timestamp_to_time(padded)
+    if t is not None:
+        return t
+    # out of range for the fast path, or invalid: let strptime decide
     try:
         return datetime.datetime.strptime(padded, TIMESTAMP).replace(tzinfo=utc).timestamp()
     except ValueError:
@@ -54,17 +89,20 @@ def timestamp_to_time(ts):
             raise ValueError('cannot parse timestamp, is it a valid cdx timestamp?: '+ts) from None
 
 
+@functools.lru_cache(maxsize=1024)
 def time_to_timestamp(t):
     '''
     >>> time_to_timestamp(915148800.0)
     '19990101000000'
     '''
-    return datetime.datetime.fromtimestamp(t, tz=datetime.timezone.utc).strftime(TIMESTAMP)
+    # same as datetime.fromtimestamp(t, tz=utc).strftime(TIMESTAMP), but much faster
+    return '%04d%02d%02d%02d%02d%02d' % time.gmtime(t)[:6]
 
 
 CC_TIMESTAMP = '%Y-%W-%w'
 
 
+@functools.lru_cache(maxsize=1024)
 def cc_index_to_time(cc):
     '''
     Convert a Commoncrawl index name YYYY-isoweek to a unixtime
@@ -76,6 +114,7 @@ def cc_index_to_time(cc):
     return datetime.datetime.strptime(cc+'-0', CC_TIMESTAMP).replace(tzinfo=utc).timestamp()
 
 
+@functools.lru_cache(maxsize=1024)
 def cc_index_to_time_special(cc):
     '''
     Convert a "special" Commoncrawl index name to a unixtime
@@ -97,13 +136,17 @@ def cc_index_to_time_special(cc):
     LOGGER.error('could not convert endpoint name %s to an end time', cc)
 
 
+# a year at minimum, a full timestamp at most
+# will have to change once we start supporting sub-second timestamps
+VALID_TIMESTAMP = re.compile(r'[0-9]{4,14}')
+
+
 def validate_timestamps(params):
-    # will have to change once we start supporting sub-second timestamps
     for key in ('from_ts', 'to', 'closest'):
         if key in params:
             value = params[key]
             if isinstance(value, str):
-                if not value.isdigit():
+                if not VALID_TIMESTAMP.fullmatch(value):
                     raise ValueError('invalid parameter {} {!r}'.format(key, value))
             elif isinstance(value, int):
                 pass
@@ -161,6 +161,7 @@ class CDXToolkitWARCWriter:
         self.warc_version = warc_version
         self.segment = 0
         self.writer = None
+        self.bytes_written = 0
 
     def write_record(self, *args, **kwargs):
         if self.writer is None:
@@ -175,11 +176,13 @@ class CDXToolkitWARCWriter:
 
         self.writer.write_record(*args, **kwargs)
 
-        fsize = os.fstat(self.fd.fileno()).st_size
-        if fsize > self.size:
+        # tell() counts buffered bytes and, unlike fstat, costs no syscall
+        self.bytes_written = self.fd.tell()
+        if self.bytes_written > self.size:
             self.fd.close()
             self.writer = None
             self.segment += 1
+            self.bytes_written = 0
 
     def _unique_warc_filename(self):
         while True:
@@ -197,7 +200,8 @@ class CDXToolkitWARCWriter:
 
     def _start_new_warc(self):
         self.filename = self._unique_warc_filename()
-        self.fd = open(self.filename, 'wb')
+        # a big buffer turns many small writes per record into ~1 MiB write()s
+        self.fd = open(self.filename, 'wb', buffering=1 << 20)
         LOGGER.info('opening new warc file %s', self.filename)
         self.writer = WARCWriter(self.fd, gzip=self.gzip, warc_version=self.warc_version)
         warcinfo = self.writer.create_warcinfo_record(self.filename, self.info)
@@ -0,0 +1,80 @@
+import socket
+import unittest.mock as mock
+
+import requests
+
+import cdx_toolkit.myrequests as myrequests
+
+
+def test_token_bucket():
+    hostname = 'bucket.example.com'
+    myrequests.retry_info[hostname] = myrequests.HostRetry(minimum_interval=2.0, burst=3)
+    now = [1000.0]
+    sleeps = []
+
+    def fake_sleep(dt):
+        sleeps.append(dt)
+        now[0] += dt
+
+    with mock.patch('time.monotonic', lambda: now[0]), mock.patch('time.sleep', fake_sleep):
+        # a full bucket allows a burst without sleeping
+        for _ in range(3):
+            myrequests.take_token(hostname)
+        assert sleeps == []
+
+        # then we are paced at minimum_interval
+        myrequests.take_token(hostname)
+        assert sleeps == [2.0]
+
+        # idle time earns credit, up to burst
+        now[0] += 100.
+        for _ in range(3):
+            myrequests.take_token(hostname)
+        assert sleeps == [2.0]
+
+        # a slow-down response spends any saved-up credit
+        now[0] += 100.
+        myrequests.take_token(hostname)
+        myrequests.slow_down(hostname)
+        myrequests.take_token(hostname)
+        assert sleeps == [2.0, 2.0]
+
+        # time spent fetching does not earn credit
+        now[0] += 1.
+        myrequests.fetch_done(hostname)
+        myrequests.take_token(hostname)
+        assert sleeps == [2.0, 2.0, 2.0]
+
+    del myrequests.retry_info[hostname]
+
+
+def test_normalize_params():
+    assert myrequests.normalize_params(None) is None
+    params = {'url': 'example.com'}
+    assert myrequests.normalize_params(params) is params
+
+    params = {'url': 'example.com', 'from_ts': '2020'}
+    assert myrequests.normalize_params(params) == {'url': 'example.com', 'from': '2020'}
+    assert params == {'url': 'example.com', 'from_ts': '2020'}, 'caller dict unchanged'
+
+
+def wrapped_gaierror(errno):
+    # roughly what requests + urllib3 do to a dns failure
+    try:
+        try:
+            raise socket.gaierror(errno, 'dns failure')
+        except socket.gaierror:
+            raise OSError('new connection error')  # implicit __context__
+    except OSError as e:
+        return requests.exceptions.ConnectionError(e)
+
+
+def test_is_dns_not_found():
+    assert myrequests.is_dns_not_found(wrapped_gaierror(socket.EAI_NONAME))
+    assert not myrequests.is_dns_not_found(wrapped_gaierror(socket.EAI_AGAIN))  # temporary failure
+    assert not myrequests.is_dns_not_found(requests.exceptions.ConnectionError('connection refused'))
+
+
+def test_dns_fatal():
+    assert not myrequests.dns_fatal('web.archive.org')
+    assert myrequests.dns_fatal('no-such-host.example.com')
@@ -1,3 +1,5 @@
+import datetime
+
 import pytest
 
 import cdx_toolkit.timeutils as timeutils
@@ -29,11 +31,30 @@ def test_time_timestamp():
         timeutils.timestamp_to_time('x')
 
 
+def test_fast_timestamp_to_time():
+    utc = datetime.timezone.utc
+    tests = ('19700101000000', '19991231235959', '20000229120000', '20240229235959',
+             '20231130010203', '20991231235959', '21000101000000', '19690704000000')
+    for ts in tests:
+        expected = datetime.datetime.strptime(ts, timeutils.TIMESTAMP).replace(tzinfo=utc).timestamp()
+        assert timeutils.timestamp_to_time(ts) == expected, ts
+
+    for ts in ('20230229', '19991301', '19990100', '19991231240000', '19991231236000', '19991231235960'):
+        with pytest.raises(ValueError):
+            timeutils.timestamp_to_time(ts)
+
+
 def test_validate_timestamps():
     with pytest.raises(ValueError):
         timeutils.validate_timestamps({'to': 'asdf'})
     with pytest.raises(ValueError):
         timeutils.validate_timestamps({'to': {}})
+    with pytest.raises(ValueError):
+        timeutils.validate_timestamps({'to': '199'})  # shorter than a year
+    with pytest.raises(ValueError):
+        timeutils.validate_timestamps({'to': '199901011200001'})  # longer than a timestamp
+    with pytest.raises(ValueError):
+        timeutils.validate_timestamps({'to': '\u0661\u0669\u0669\u0669'})  # isdigit() but not ascii
     timeutils.validate_timestamps({'to': '12345'})
     timeutils.validate_timestamps({'to': 12345})
     assert True
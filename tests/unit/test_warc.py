@@ -1,3 +1,8 @@
+from io import BytesIO
+import os
+
+from warcio import WARCWriter
+
 import cdx_toolkit.warc
 
 
@@ -5,3 +10,20 @@ def test_wb_redir_to_original():
     location = 'https://web.archive.org/web/20110209062054id_/http://commoncrawl.org/'
     ret = 'http://commoncrawl.org/'
     assert cdx_toolkit.warc.wb_redir_to_original(location) == ret
+
+
+def test_writer_rollover(tmpdir):
+    prefix = str(tmpdir.join('TEST'))
+    writer = cdx_toolkit.warc.get_writer(prefix, None, {'software': 'test'}, size=1000, gzip=False)
+    maker = WARCWriter(None, gzip=False)
+    for i in range(3):
+        record = maker.create_warc_record('http://example.com/{}'.format(i), 'resource',
+                                          payload=BytesIO(b'x' * 600))
+        writer.write_record(record)
+        assert writer.writer is None and writer.bytes_written == 0
+
+    # every record pushes its file past size=1000, so each one gets its own file
+    names = sorted(os.listdir(str(tmpdir)))
+    assert names == ['TEST-00000{}.extracted.warc'.format(i) for i in range(3)]
+    for name in names:
+        assert os.path.getsize(str(tmpdir.join(name))) > 1000